@@ -5,11 +5,19 @@ Key features
 ------------
 * **Single playback worker** driven by an ``asyncio.Queue`` – avoids
   concurrent PortAudio streams that used to corrupt memory.
+* **Persistent output stream**: one ``sd.OutputStream`` is opened once and
+  fed with blocking ``write()`` calls, so no Python runs on the audio
+  thread and clips don't pay for a stream (re)open.
 * **Stereo‑safe decoder**: reshapes WAV frames to ``(frames, channels)``
   so CoreAudio receives the correct layout and doesn’t raise -10851 /
   PaError ‑9986.
 * **Automatic PortAudio recovery**: on ``sounddevice.PortAudioError`` we
   reset the stream and retry once.
+* **Binary audio frames**: clips arrive as a JSON header followed by a
+  binary WebSocket frame holding the raw WAV bytes (legacy chunked JSON
+  byte lists are still understood).  Once the server announces
+  ``{"sr": …, "ch": …, "dtype": "int16"}`` the frames are raw PCM and go
+  straight to an int16 output stream without any decoding.
 * **HTTP endpoints** (``/`` and ``/recording``) let external code signal
   *start/stop speaking*.
 * **Configurable port**: set ``ROBOT_HTTP_PORT`` env‑var to avoid clashes.
@@ -23,18 +31,23 @@ import asyncio
 import base64
 import errno
 import io
-import json
+import itertools
 import os
+import struct
 import sys
 import time
 import wave
-from typing import Optional, Tuple
+from typing import Awaitable, Callable, Iterator, List, Optional, Tuple
 
 import numpy as np
+import orjson
 import sounddevice as sd
 import websockets
 from aiohttp import web
 
+if sys.platform != "win32":
+    import uvloop  # libuv event loop – faster sockets; no Windows support
+
 # ---------------------------------------------------------------------------
 # CONFIGURATION
 # ---------------------------------------------------------------------------
@@ -60,81 +73,251 @@ HTTP_PORT = int(os.getenv("ROBOT_HTTP_PORT", 5000))
 # ---------------------------------------------------------------------------
 # GLOBAL STATE
 # ---------------------------------------------------------------------------
-playback_queue: asyncio.Queue[Tuple[str, bytes]] = asyncio.Queue()
+PLAYBACK_QUEUE_SIZE = 8  # clips waiting to play; oldest dropped beyond this
+RAW_FRAME_QUEUE_SIZE = 64  # frames read but not yet parsed; reader waits beyond this
+# (words, audio bytes, (samplerate, channels) for raw int16 PCM or None for WAV)
+playback_queue: asyncio.Queue[Tuple[List[str], bytes, Optional[Tuple[int, int]]]] = asyncio.Queue(
+    maxsize=PLAYBACK_QUEUE_SIZE
+)
 stop_playback_event = asyncio.Event()  # set() → interrupt current clip
 spoken_text: str = ""  # what portion of TTS actually played
 
 # ---------------------------------------------------------------------------
 # WAV HELPERS
 # ---------------------------------------------------------------------------
+_PCM16_SCALE = np.float32(1.0 / 32768.0)
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Pre‑allocated decode targets (30 s of 48 kHz stereo, ~11 MB each) so the
+# audio path doesn't churn the allocator.  Two of them: one holds the clip
+# that's playing, the other receives the prefetched decode.  Longer clips
+# fall back to a fresh allocation.
+MAX_FRAMES = 30 * 48_000
+MAX_CHANNELS = 2
+_scratch = [np.empty(MAX_FRAMES * MAX_CHANNELS, dtype=np.float32) for _ in range(2)]
+
+
+def _pcm16_view(buf: bytes) -> Optional[Tuple[int, np.ndarray]]:
+    """Return (samplerate, pcm[f, ch]) viewing the int16 samples of *buf*.
+
+    Walks the RIFF chunks by hand and views the ``data`` chunk in place –
+    nothing is copied.  Returns ``None`` for anything that isn't plain
+    16‑bit PCM so the caller can fall back to :mod:`wave`.
+    """
+    if len(buf) < 12 or buf[0:4] != b"RIFF" or buf[8:12] != b"WAVE":
+        return None
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(buf):
+        chunk_id = buf[pos:pos + 4]
+        (chunk_len,) = struct.unpack("<I", buf[pos + 4:pos + 8])
+        body = pos + 8
+        if chunk_id == b"fmt " and chunk_len >= 16:
+            fmt = buf[body:body + chunk_len]
+        elif chunk_id == b"data":
+            break
+        pos = body + chunk_len + (chunk_len & 1)  # chunks are word aligned
+    else:
+        return None  # no data chunk
+    if fmt is None:
+        return None
+
+    fmt_tag, n_ch, sr = struct.unpack("<HHI", fmt[0:8])
+    (bits,) = struct.unpack("<H", fmt[14:16])
+    if fmt_tag == _WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        (fmt_tag,) = struct.unpack("<H", fmt[24:26])  # sub‑format GUID
+    if fmt_tag != _WAVE_FORMAT_PCM or bits != 16 or n_ch < 1:
+        return None
+
+    # streamed WAVs may carry a bogus length – trust the buffer instead
+    data_len = min(chunk_len, len(buf) - body)
+    n_samples = data_len // (2 * n_ch) * n_ch
+    pcm = np.frombuffer(buf, dtype=np.int16, count=n_samples, offset=body)
+    return sr, pcm.reshape(-1, n_ch)
+
+
+def _pcm16_frames(buf: bytes, n_ch: int) -> np.ndarray:
+    """View raw interleaved int16 PCM in *buf* as ``(frames, n_ch)`` – no copy."""
+    n_samples = len(buf) // (2 * n_ch) * n_ch
+    return np.frombuffer(buf, dtype=np.int16, count=n_samples).reshape(-1, n_ch)
+
+
+def _decode_wav(audio_bytes: bytes, out: Optional[np.ndarray] = None) -> Tuple[int, np.ndarray]:
+    """Return (samplerate, audio[f, ch]) in float32 ∈ [-1, 1].
+
+    PCM16 clips are converted with a single fused multiply.  If they fit,
+    they are written into the flat float32 scratch buffer *out* and the
+    result is a view of it; otherwise a new array is allocated.
+    """
+    parsed = _pcm16_view(audio_bytes)
+    if parsed is not None:
+        sr, pcm = parsed
+        if out is None or pcm.size > out.size:
+            return sr, np.multiply(pcm, _PCM16_SCALE, dtype=np.float32)
+        audio = out[:pcm.size].reshape(pcm.shape)
+        np.multiply(pcm, _PCM16_SCALE, out=audio)
+        return sr, audio
 
-def _decode_wav(audio_bytes: bytes) -> Tuple[int, np.ndarray]:
-    """Return (samplerate, audio[f, ch]) in float32 ∈ [-1, 1]."""
     with wave.open(io.BytesIO(audio_bytes), "rb") as wf:
         sr = wf.getframerate()
         n_ch = wf.getnchannels()
         frames = wf.readframes(wf.getnframes())
-    
+
     audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
-    if n_ch > 1:
-        audio = audio.reshape(-1, n_ch)
-    return sr, audio
+    return sr, audio.reshape(-1, n_ch)
+
+# ---------------------------------------------------------------------------
+# OUTPUT STREAM
+# ---------------------------------------------------------------------------
+WRITE_BLOCK = 4096  # frames handed to PortAudio per write()
+
+_stream: Optional[sd.OutputStream] = None
+
+
+async def _get_stream(sr: int, channels: int, dtype: str) -> sd.OutputStream:
+    """Return the long‑lived output stream, reopening it on a format change.
+
+    The old stream is drained first: close() would discard the last output
+    latency of the previous clip – often its final word.
+    """
+    global _stream
+    if _stream is not None and (
+        _stream.samplerate != sr or _stream.channels != channels or _stream.dtype != dtype
+    ):
+        # stop() blocks until PortAudio's buffers have played out
+        await asyncio.to_thread(_stream.stop, ignore_errors=True)
+        _stream.close(ignore_errors=True)
+        _stream = None
+    if _stream is None:
+        _stream = sd.OutputStream(
+            samplerate=sr,
+            channels=channels,
+            dtype=dtype,
+            blocksize=2048,
+            latency="high",
+        )
+    if _stream.stopped:  # fresh stream, or abort()ed by an interruption
+        _stream.start()
+    return _stream
+
+
+def _reset_stream() -> None:
+    """Drop the current stream so the next clip opens a fresh one.
+
+    Only used after a PortAudio error, so nothing is drained.
+    """
+    global _stream
+    if _stream is not None:
+        _stream.close(ignore_errors=True)
+        _stream = None
 
 # ---------------------------------------------------------------------------
 # PLAYBACK WORKER
 # ---------------------------------------------------------------------------
+def _start_clip(
+    words: List[str],
+    audio_bytes: bytes,
+    pcm_format: Optional[Tuple[int, int]],
+    scratch: Iterator[np.ndarray],
+) -> Optional[Tuple[List[str], asyncio.Future]]:
+    """Validate a queued clip and start decoding it in a worker thread.
+
+    A WAV clip is decoded into the next buffer from *scratch*; the buffer is
+    only taken once a decode is actually started, so invalid clips don't
+    upset the playing / prefetching alternation.  Raw int16 PCM
+    (*pcm_format* given) needs no decoding: it is played from a view of
+    *audio_bytes* through an int16 stream.  So is a PCM16 WAV that matches
+    the int16 stream already open – a server mixing WAV and raw PCM then
+    doesn't force a reopen on every switch.
+    """
+    if not isinstance(audio_bytes, bytes):  # Ensure the audio data is in bytes
+        print(f"Received invalid audio data")
+        return None
+    if pcm_format is not None:
+        sr, n_ch = pcm_format
+        decoded = asyncio.get_running_loop().create_future()
+        decoded.set_result((sr, _pcm16_frames(audio_bytes, n_ch)))
+        return words, decoded
+    if _stream is not None and _stream.dtype == "int16":
+        parsed = _pcm16_view(audio_bytes)
+        if parsed is not None and parsed[0] == _stream.samplerate and parsed[1].shape[1] == _stream.channels:
+            decoded = asyncio.get_running_loop().create_future()
+            decoded.set_result(parsed)
+            return words, decoded
+    out = next(scratch)
+    return words, asyncio.create_task(asyncio.to_thread(_decode_wav, audio_bytes, out))
+
+
 async def playback_worker() -> None:
     """Continuously pull clips from the queue and play them serially."""
     global spoken_text
 
+    # next clip, taken off the queue early so it decodes while this one plays
+    prefetched: Optional[Tuple[List[str], asyncio.Future]] = None
+    scratch = itertools.cycle(_scratch)  # alternate: playing / prefetching
+
     while True:
-        text, audio_bytes = await playback_queue.get()
-        stop_playback_event.clear()
-        if isinstance(audio_bytes, bytes):  # Ensure the audio data is in bytes
-            sr, audio = _decode_wav(audio_bytes)  # Decode and play the audio
+        if prefetched is not None:
+            clip, prefetched = prefetched, None
         else:
-            print(f"Received invalid audio data")
+            clip = _start_clip(*await playback_queue.get(), scratch)
+            if clip is None:
+                continue
+        words, decoding = clip
+        stop_playback_event.clear()
+        try:
+            sr, audio = await decoding
+        except (wave.Error, EOFError, ValueError) as exc:
+            print(f"❌ Could not decode clip: {exc}")
             continue
         duration = len(audio) / sr
-        channels = 1 if audio.ndim == 1 else audio.shape[1]
+        channels = audio.shape[1]
         print(f"🔊 clip: {duration:.2f}s @ {sr} Hz, {channels}ch")
 
-        if isinstance(text, dict):
-            text = text.get("text", "")  # Adjust this line based on your data structure
-
-        words = text.split()
-        word_dur = duration / len(words) if words else 0.0
+        # frames per word, for mapping the playback position to spoken text
+        word_frames = max(len(audio) // len(words), 1) if words else 0
 
+        written = 0  # frames handed to PortAudio so far
+        unheard = 0  # of those, frames still queued when abort() dropped them
         for attempt in (1, 2):  # try at most twice
             try:
-                sd.stop()
-                sd.play(audio, sr, blocking=False)
-                start = time.time()
-                while True:
+                stream = await _get_stream(sr, channels, audio.dtype.name)
+                # resume where a failed attempt left off
+                for i in range(written, len(audio), WRITE_BLOCK):
                     if stop_playback_event.is_set():
-                        sd.stop()
+                        # PortAudio holds about one output latency of audio
+                        # ahead of the speaker; abort() discards it unplayed
+                        unheard = min(written, round(stream.latency * sr))
+                        stream.abort()
                         print("⏹️  Playback interrupted by user")
                         break
-                    if (time.time() - start) >= duration:
-                        break
-                    await asyncio.sleep(0.05)
+                    if prefetched is None and not playback_queue.empty():
+                        prefetched = _start_clip(*playback_queue.get_nowait(), scratch)
+                    block = audio[i:i + WRITE_BLOCK]
+                    # write() blocks inside PortAudio until the block is
+                    # queued – wait for it off the event loop
+                    await asyncio.to_thread(stream.write, block)
+                    written = i + len(block)
                 break  # success – break out of retry loop
             except sd.PortAudioError as exc:
                 if attempt == 2:
                     print(f"❌ PortAudio failure: {exc}")
                     break
                 print(f"⚠️  PortAudio error ({exc}); resetting …")
-                sd.stop(); sd.wait()
+                _reset_stream()
                 await asyncio.sleep(0.05)  # let CoreAudio settle
-                # second attempt uses blocking=True to fully reset
-                sd.play(audio, sr, blocking=True)
-                # loop will exit immediately after blocking play
-                start = time.time() - duration
-                break
+
+        # an interruption flushes the queue – that includes the prefetched clip
+        if prefetched is not None and stop_playback_event.is_set():
+            # the decode thread can't be cancelled – let it finish so its
+            # scratch buffer is free before it gets reused
+            await asyncio.gather(prefetched[1], return_exceptions=True)
+            prefetched = None
 
         # figure out how much was spoken
-        elapsed = min(time.time() - start, duration)
-        spoken_words = int(elapsed / word_dur) if word_dur else 0
+        spoken_words = (written - unheard) // word_frames if word_frames else 0
         spoken_text = " ".join(words[:spoken_words])
         if spoken_text:
             print(f"🗣️  Spoken text: '{spoken_text}'")
@@ -144,13 +327,24 @@ async def playback_worker() -> None:
 # ---------------------------------------------------------------------------
 # ENQUEUE FUNCTION
 # ---------------------------------------------------------------------------
-async def enqueue_clip(audio_bytes: str, text: str = "") -> None:
-    """Place a clip on the playback queue, dropping old clips if stopped."""
-    try:
-        print(f"Received audio of length: {len(audio_bytes)} bytes")
-        playback_queue.put_nowait((text, audio_bytes))
-    except asyncio.QueueFull:
-        print("⚠️  Playback queue full – dropping clip")
+async def enqueue_clip(
+    audio_bytes: bytes, text: str = "", pcm_format: Optional[Tuple[int, int]] = None
+) -> None:
+    """Place a clip on the playback queue, dropping the oldest clips if full.
+
+    *pcm_format* is ``(samplerate, channels)`` when *audio_bytes* is raw
+    int16 PCM rather than a WAV file.  *text* is split into words here, off
+    the playback path.
+    """
+    print(f"Received audio of length: {len(audio_bytes)} bytes")
+    if isinstance(text, dict):
+        text = text.get("text", "")  # Adjust this line based on your data structure
+    words = text.split()
+    # bounded queue: under a burst, stale clips give way to the newest one
+    while playback_queue.full():
+        playback_queue.get_nowait()
+        print("⚠️  Playback queue full – dropping oldest clip")
+    playback_queue.put_nowait((words, audio_bytes, pcm_format))
 
 # ---------------------------------------------------------------------------
 # HTTP ENDPOINTS
@@ -204,7 +398,120 @@ audio_chunks_buffer = {}
 chunk_receive_timeouts = {}
 chunk_receive_start_times = {}
 
-async def _generic_socket(uri: str, label: str) -> None:
+async def _parse_messages(raw_q: asyncio.Queue, check_robot_id: bool) -> None:
+    """Parse frames handed over by the socket reader and enqueue their audio.
+
+    Runs as its own task so a burst of frames is drained off the websocket
+    straight away instead of waiting behind JSON decoding.  There is one
+    parser per socket: frames must stay in order, since a binary audio
+    frame belongs to the header just before it.  With *check_robot_id*,
+    messages addressed to any robot but ``ROBOT_ID`` are skipped.
+    """
+    # text of the last header, waiting for its binary audio frame
+    pending_text: Optional[str] = None
+    # (samplerate, channels) once the server announces raw int16
+    # PCM; until then binary frames are WAV files
+    pcm_format: Optional[Tuple[int, int]] = None
+    while True:
+        raw = await raw_q.get()
+        if raw is None:  # socket closed
+            return
+
+        if isinstance(raw, bytes):
+            # raw WAV or PCM bytes belonging to the preceding header
+            if pending_text is None:
+                print("⚠️  Binary frame without header – dropping")
+                continue
+            # a WAV file stays on the WAV path even after PCM was announced
+            fmt = None if raw[:4] == b"RIFF" else pcm_format
+            await enqueue_clip(raw, pending_text, fmt)
+            pending_text = None
+            continue
+
+        try:
+            msg = orjson.loads(raw)
+        except orjson.JSONDecodeError as exc:
+            print(f"❌ JSON error: {exc}")
+            continue
+
+        # Format announcement – connection-wide, so it's taken before the
+        # robot filter (it needn't carry a robot_id), unless it is
+        # explicitly addressed to another robot
+        if msg.get("dtype") == "int16" and "sr" in msg and (
+            not check_robot_id or msg.get("robot_id", ROBOT_ID) == ROBOT_ID
+        ):
+            try:
+                sr, n_ch = int(msg["sr"]), int(msg.get("ch", 1))
+            except (TypeError, ValueError):
+                sr, n_ch = 0, 0
+            if sr > 0 and n_ch >= 1:
+                pcm_format = (sr, n_ch)
+                print(f"🎚️  Raw PCM audio: {pcm_format[0]} Hz, {pcm_format[1]}ch")
+            else:
+                print(f"⚠️  Ignoring invalid PCM format: sr={msg['sr']!r}, ch={msg.get('ch')!r}")
+
+        # plain bool first: the lecture socket never looks at robot_id
+        if check_robot_id and msg.get("robot_id") != ROBOT_ID:
+            pending_text = None  # its audio frame isn't ours either
+            continue
+
+        text = msg.get("text", "")
+        if text:
+            print(f"📝 {text}")
+
+        # Handle (legacy) audio chunks sent as JSON byte lists
+        if "audio_chunk" in msg:
+            chunk = msg["audio_chunk"]
+            sequence_number = chunk["sequence_number"]
+            total_chunks = chunk["total_chunks"]
+            data = bytes(chunk["data"])
+
+            # Store the chunk in the buffer
+            if msg["robot_id"] not in audio_chunks_buffer:
+                audio_chunks_buffer[msg["robot_id"]] = [None] * total_chunks
+                # Set a timeout for receiving all chunks
+                chunk_receive_timeouts[msg["robot_id"]] = asyncio.get_event_loop().time() + 10  # 10 seconds timeout
+                # Log the time when the first chunk is received
+                chunk_receive_start_times[msg["robot_id"]] = time.time()
+                print(f"⏱️ First chunk received for {msg['robot_id']} at {chunk_receive_start_times[msg['robot_id']]}")
+
+            audio_chunks_buffer[msg["robot_id"]][sequence_number] = data
+
+            # Check if all chunks are received
+            if None not in audio_chunks_buffer[msg["robot_id"]]:
+                # Reconstruct the full audio
+                audio_bytes = b"".join(audio_chunks_buffer[msg["robot_id"]])
+                del audio_chunks_buffer[msg["robot_id"]]  # Clear buffer
+                del chunk_receive_timeouts[msg["robot_id"]]  # Clear timeout
+                # Log the time when the last chunk is received
+                end_time = time.time()
+                duration = end_time - chunk_receive_start_times[msg["robot_id"]]
+                print(f"⏱️ Last chunk received for {msg['robot_id']} at {end_time}")
+                print(f"⏱️ Total time to receive all chunks: {duration:.2f} seconds")
+                del chunk_receive_start_times[msg["robot_id"]]  # Clear start time
+                print(f"Received complete audio of length: {len(audio_bytes)} bytes")
+                await enqueue_clip(audio_bytes, text)
+            else:
+                # Check for timeout
+                if asyncio.get_event_loop().time() > chunk_receive_timeouts[msg["robot_id"]]:
+                    print(f"⚠️ Timeout: Not all chunks received for {msg['robot_id']}")
+                    del audio_chunks_buffer[msg["robot_id"]]  # Clear buffer
+                    del chunk_receive_timeouts[msg["robot_id"]]  # Clear timeout
+                    del chunk_receive_start_times[msg["robot_id"]]  # Clear start time
+                    # Optionally, implement a retry mechanism here
+        else:
+            # Header of a binary audio frame – the audio bytes follow
+            # as the next message and never go through the JSON parser
+            pending_text = text
+
+
+async def _read_frames(ws, raw_q: asyncio.Queue) -> None:
+    """Hand every frame of *ws* to the parser; waits while its queue is full."""
+    async for raw in ws:
+        await raw_q.put(raw)
+
+
+async def _generic_socket(uri: str, label: str, check_robot_id: bool, register: bool) -> None:
     retry = 0
     while True:
         try:
@@ -212,68 +519,34 @@ async def _generic_socket(uri: str, label: str) -> None:
             async with websockets.connect(uri, ping_interval=None, close_timeout=10, max_size=None) as ws:
                 print(f"🔗 Connected ({label})")
                 retry = 0
-                if label == "primary":
-                    await ws.send(json.dumps({
+                if register:
+                    await ws.send(orjson.dumps({
                         "type": "register",
                         "data": {
                             "client": "audio"      # lets server distinguish roles
                         },
                         "ts": time.time(),
-                    }))
-                async for raw in ws:
-                    try:
-                        msg = json.loads(raw)
-                    except json.JSONDecodeError as exc:
-                        print(f"❌ JSON error: {exc}")
-                        continue
-
-                    if label == "primary" and msg.get("robot_id") != ROBOT_ID:
-                        continue
-
-                    text = msg.get("text", "")
-                    if text:
-                        print(f"📝 {text}")
-
-                    # Handle audio chunks
-                    if "audio_chunk" in msg:
-                        chunk = msg["audio_chunk"]
-                        sequence_number = chunk["sequence_number"]
-                        total_chunks = chunk["total_chunks"]
-                        data = bytes(chunk["data"])
-
-                        # Store the chunk in the buffer
-                        if msg["robot_id"] not in audio_chunks_buffer:
-                            audio_chunks_buffer[msg["robot_id"]] = [None] * total_chunks
-                            # Set a timeout for receiving all chunks
-                            chunk_receive_timeouts[msg["robot_id"]] = asyncio.get_event_loop().time() + 10  # 10 seconds timeout
-                            # Log the time when the first chunk is received
-                            chunk_receive_start_times[msg["robot_id"]] = time.time()
-                            print(f"⏱️ First chunk received for {msg['robot_id']} at {chunk_receive_start_times[msg['robot_id']]}")
-
-                        audio_chunks_buffer[msg["robot_id"]][sequence_number] = data
-
-                        # Check if all chunks are received
-                        if None not in audio_chunks_buffer[msg["robot_id"]]:
-                            # Reconstruct the full audio
-                            audio_bytes = b"".join(audio_chunks_buffer[msg["robot_id"]])
-                            del audio_chunks_buffer[msg["robot_id"]]  # Clear buffer
-                            del chunk_receive_timeouts[msg["robot_id"]]  # Clear timeout
-                            # Log the time when the last chunk is received
-                            end_time = time.time()
-                            duration = end_time - chunk_receive_start_times[msg["robot_id"]]
-                            print(f"⏱️ Last chunk received for {msg['robot_id']} at {end_time}")
-                            print(f"⏱️ Total time to receive all chunks: {duration:.2f} seconds")
-                            del chunk_receive_start_times[msg["robot_id"]]  # Clear start time
-                            print(f"Received complete audio of length: {len(audio_bytes)} bytes")
-                            await enqueue_clip(audio_bytes, text)
-                        else:
-                            # Check for timeout
-                            if asyncio.get_event_loop().time() > chunk_receive_timeouts[msg["robot_id"]]:
-                                print(f"⚠️ Timeout: Not all chunks received for {msg['robot_id']}")
-                                del audio_chunks_buffer[msg["robot_id"]]  # Clear buffer
-                                del chunk_receive_timeouts[msg["robot_id"]]  # Clear timeout
-                                del chunk_receive_start_times[msg["robot_id"]]  # Clear start time
-                                # Optionally, implement a retry mechanism here
+                    }).decode())
+                # Reading and parsing are decoupled: the reader only drains
+                # the socket, the parser task does the JSON work
+                raw_q: asyncio.Queue = asyncio.Queue(maxsize=RAW_FRAME_QUEUE_SIZE)
+                reader = asyncio.create_task(_read_frames(ws, raw_q))
+                parser = asyncio.create_task(_parse_messages(raw_q, check_robot_id))
+                eos: Optional[asyncio.Task] = None
+                try:
+                    # whichever ends first – a dead parser is noticed at once,
+                    # even on an idle socket
+                    await asyncio.wait({reader, parser}, return_when=asyncio.FIRST_COMPLETED)
+                    if reader.done():
+                        # socket closed, cleanly or not: parse what was
+                        # already queued before reporting it
+                        eos = asyncio.create_task(raw_q.put(None))
+                    await parser  # parser errors win
+                    reader.result()  # re-raise connection errors
+                finally:
+                    for task in (reader, parser, eos):
+                        if task is not None:
+                            task.cancel()
 
         except Exception as exc:
             retry += 1
@@ -281,8 +554,22 @@ async def _generic_socket(uri: str, label: str) -> None:
             print(f"⚠️  {label} socket error: {exc} – reconnecting in {delay}s …")
             await asyncio.sleep(delay)
 
-auth_primary = lambda: _generic_socket(PRIMARY_WS_URI, "primary")
-auth_lecture = lambda: _generic_socket(LECTURE_WS_URI, "lecture")
+
+def _make_socket(
+    uri: str, label: str, check_robot_id: bool, register: bool
+) -> Callable[[], Awaitable[None]]:
+    """Return a socket coroutine factory specialised for one endpoint.
+
+    Whether the parser filters on ``robot_id`` is fixed here, once, so the
+    per‑frame loop tests a bool instead of comparing labels: with
+    *check_robot_id* only messages for ``ROBOT_ID`` are played.  *register*
+    sends the register message on connect.
+    """
+    return lambda: _generic_socket(uri, label, check_robot_id, register)
+
+
+auth_primary = _make_socket(PRIMARY_WS_URI, "primary", check_robot_id=True, register=True)
+auth_lecture = _make_socket(LECTURE_WS_URI, "lecture", check_robot_id=False, register=False)
 
 # ---------------------------------------------------------------------------
 # MAIN
@@ -295,6 +582,9 @@ async def main() -> None:
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if sys.platform == "win32":
+            asyncio.run(main())
+        else:
+            uvloop.run(main())
     except KeyboardInterrupt:
         print("\n👋 Bye!")
\ No newline at end of file
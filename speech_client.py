@@ -1,11 +1,9 @@
-import pyaudio
 import numpy as np
+import sounddevice as sd
 import webrtcvad
-import wave
-import io
-import base64
 import asyncio
-import json
+import collections
+import orjson
 import websockets
 import sys
 import time
@@ -14,6 +12,9 @@ import aiohttp  # Add this import at the top of your file
 import datetime  # Add this import at the top of your file
 from tzlocal import get_localzone  # Import get_localzone from tzlocal
 
+if sys.platform != "win32":
+    import uvloop  # libuv event loop – faster sockets; no Windows support
+
 # Constants for the WebSocket connection and audio processing
 ROBOT_ID = "robot_1"
 # WEBSOCKET_URI = "wss://app-ragbackend-dev-wus-001.azurewebsites.net/ws/{ROBOT_ID}/before/lecture"
@@ -29,15 +30,25 @@ SAMPLE_WIDTH = 2  # 16-bit samples (int16)
 VOLUME_THRESHOLD = 3000  # Volume threshold for speech detection
 SILENCE_THRESHOLD = 66  # Number of silent frames before stopping recording
 
+# Local timezone sent with each clip; looked up once since get_localzone()
+# reads /etc/localtime from disk
+LOCAL_REGION = str(get_localzone())
+
 # Initialize the WebRTC VAD
 vad = webrtcvad.Vad(VAD_MODE)
 
-stash = []  # Global list to store audio data
+stash = collections.deque()  # Global queue of audio waiting to be sent
 
 def is_speech(audio_bytes):
     """Check if audio contains speech using WebRTC VAD."""
     return vad.is_speech(audio_bytes, SAMPLE_RATE)
 
+def peak_level(audio_bytes):
+    """Return the peak absolute amplitude of an int16 audio frame."""
+    samples = np.frombuffer(audio_bytes, dtype=np.int16)  # view, no copy
+    # min/max in Python ints: np.abs would wrap -32768 back to -32768
+    return max(-int(samples.min()), int(samples.max()))
+
 async def record_audio(websocket):
     """Record audio with voice activity detection (VAD)."""
     buffer = []  # Buffer to store audio frames
@@ -45,10 +56,18 @@ async def record_audio(websocket):
     silence_count = 0  # Counter for silent frames
     start_speaking = False  # Flag to track if user start speaking
 
-    # Initialize PyAudio and open a stream for recording
-    p = pyaudio.PyAudio()
-    stream = p.open(format=pyaudio.paInt16, channels=CHANNELS, rate=SAMPLE_RATE,
-                    input=True, frames_per_buffer=FRAME_SIZE)
+    # Open a callback-driven input stream; PortAudio's thread hands each
+    # frame to the event loop, so nothing blocks waiting for the mic
+    loop = asyncio.get_running_loop()
+    frames = asyncio.Queue()
+
+    def on_audio(indata, frame_count, time_info, status):
+        """Queue one captured frame (runs on the PortAudio thread)."""
+        loop.call_soon_threadsafe(frames.put_nowait, bytes(indata))
+
+    stream = sd.RawInputStream(samplerate=SAMPLE_RATE, blocksize=FRAME_SIZE, dtype="int16",
+                               channels=CHANNELS, callback=on_audio)
+    stream.start()
 
     print("🎙️ Waiting for speech...")
     last_status_time = time.time()  # Track the last time a status was sent
@@ -57,16 +76,15 @@ async def record_audio(websocket):
     try:
         while True:
             global spoken_text
-            # Read a chunk of audio data from the stream
-            audio_chunk = stream.read(FRAME_SIZE, exception_on_overflow=False)
-            mono_audio = np.frombuffer(audio_chunk, dtype=np.int16)  # Convert to numpy array
-            audio_bytes = mono_audio.tobytes()  # Convert to bytes
+            # Wait for the next chunk of audio data from the stream
+            audio_chunk = await frames.get()
 
-            # Check for speech using VAD and volume threshold
-            if vad.is_speech(audio_bytes, SAMPLE_RATE) and np.max(np.abs(mono_audio)) >= VOLUME_THRESHOLD:
+            # Check for speech using VAD and volume threshold; the level is
+            # only measured for frames the VAD already flagged as speech
+            if vad.is_speech(audio_chunk, SAMPLE_RATE) and (level := peak_level(audio_chunk)) >= VOLUME_THRESHOLD:
                 if not recording:
                     print("🗣️ Speech detected!")
-                buffer.append(audio_bytes)  # Add audio to buffer
+                buffer.append(audio_chunk)  # Add audio to buffer
                 recording = True
                 silence_count = 0  # Reset silence counter
 
@@ -78,10 +96,10 @@ async def record_audio(websocket):
                             else:
                                 print(f"Failed to send message: {response.status}")
                     start_speaking = True
-                print("Current Audio Volume:", np.max(np.abs(mono_audio)))
+                print("Current Audio Volume:", level)
                 start_waiting_time = time.time()  # Reset waiting time on speech detection
             elif recording:
-                buffer.append(audio_bytes)  # Continue recording during silence
+                buffer.append(audio_chunk)  # Continue recording during silence
                 silence_count += 1
                 if silence_count > SILENCE_THRESHOLD:
                     print("✅ Recording complete.")
@@ -98,31 +116,20 @@ async def record_audio(websocket):
                     break
 
                 if time.time() - last_status_time >= 10:
-                    await websocket.send(json.dumps({"robot_id": ROBOT_ID, "status": "waiting"}))
+                    await websocket.send(orjson.dumps({"robot_id": ROBOT_ID, "status": "waiting"}).decode())
                     last_status_time = time.time()
 
     finally:
         # Clean up the audio stream
-        stream.stop_stream()
+        stream.stop()
         stream.close()
-        p.terminate()
 
     if not buffer:
         return None
 
-    # Convert the recorded audio to WAV format
-    byte_stream = io.BytesIO()
-    wav_writer = wave.Wave_write(byte_stream)
-    wav_writer.setnchannels(CHANNELS)
-    wav_writer.setsampwidth(SAMPLE_WIDTH)
-    wav_writer.setframerate(SAMPLE_RATE)
-    wav_writer.writeframes(b''.join(buffer))
-
-    # # Return the audio as a base64-encoded string
-    # return base64.b64encode(byte_stream.getvalue()).decode("utf-8")
-
-    # Return the audio as raw bytes
-    return byte_stream.getvalue()  # Return raw audio bytes
+    # Return the audio as raw int16 PCM (SAMPLE_RATE, CHANNELS) – no WAV
+    # wrapping; the format travels in the message header instead
+    return b''.join(buffer)
 
 
 async def get_backend_choice():
@@ -179,39 +186,45 @@ async def process_audio_and_send():
 
                 # 🔁 Stay in conversation loop
                 while True:
-                    # audio_base64 = await record_audio(websocket)
                     audio_bytes = await record_audio(websocket)
 
                     if audio_bytes:
-                        # Convert the audio bytes to a list of integers
-                        audio_int_list = list(audio_bytes)
-
-                        await websocket.send(json.dumps({
+                        await websocket.send(orjson.dumps({
                             "type": "register",
                             "data": {
                                 "robot_id": ROBOT_ID,     # redundant but explicit
                                 "client":   "speech"      # lets server distinguish roles
                             },
                             "ts": time.time(),
-                        }))
+                        }).decode())
                         
-                        push(audio_int_list)
-                        for audio in stash[:]:
+                        push(audio_bytes)
+                        # Pipeline the flush: send everything stashed (oldest
+                        # first), then collect the replies in the same order
+                        sent = 0
+                        while stash:
+                            audio = stash[0]
                             local_time = datetime.datetime.now().isoformat()
-                            local_region = str(get_localzone())
-                            await websocket.send(json.dumps({
+                            # Metadata as a text frame, then the PCM itself
+                            # as a binary frame
+                            await websocket.send(orjson.dumps({
                                 "type": "speech",
                                 "data": {
                                     "robot_id": ROBOT_ID,
-                                    "audio": audio,
                                     "backend": backend_choice,
                                     "spoken_text": spoken_text,
                                     "local_time": local_time,
-                                    "local_region": local_region
+                                    "local_region": LOCAL_REGION,
+                                    "sample_rate": SAMPLE_RATE,
+                                    "channels": CHANNELS,
+                                    "sample_width": SAMPLE_WIDTH
                                 },
                                 "ts": time.time(),
-                            }))
-                            stash.remove(audio)
+                            }).decode())
+                            await websocket.send(audio)
+                            stash.popleft()  # only once it's actually been sent
+                            sent += 1
+                        for _ in range(sent):
                             response = await websocket.recv()
                             print(f"📝 Transcription: {response}")
                     else:
@@ -240,5 +253,8 @@ async def main():
     """Main function to start the audio processing and sending loop."""
     await process_audio_and_send()
 
-# Run the async loop
-asyncio.run(main())
\ No newline at end of file
+# Run the async loop (uvloop where it's available)
+if sys.platform == "win32":
+    asyncio.run(main())
+else:
+    uvloop.run(main())
\ No newline at end of file
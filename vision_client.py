@@ -1,6 +1,7 @@
 # === client.py ===
 import cv2
 import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import json
 import logging
@@ -12,8 +13,88 @@ logger = logging.getLogger(__name__)
 # SERVER_URL = " https://api-visionserver-dev-wus-001.azurewebsites.net/upload/"
 SERVER_URL = " http://localhost:7000/upload/"
 CAPTURE_INTERVAL = 2  # seconds
+JPEG_QUALITY = 80  # smaller uploads than OpenCV's default of 95
+UPLOAD_MAX_SIZE = (640, 480)  # (w, h) frames are shrunk to fit before encoding
 robot_id = "robot_1"
 
+# Reuse one keep-alive connection for all uploads instead of a new TCP
+# (and TLS) handshake every CAPTURE_INTERVAL
+session = requests.Session()
+adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1)
+session.mount("http://", adapter)
+session.mount("https://", adapter)
+
+
+def _downscale(frame):
+    """Shrink *frame* to fit UPLOAD_MAX_SIZE, keeping its aspect ratio.
+
+    Returns the (possibly) resized frame and the scale factor applied.
+    """
+    h, w = frame.shape[:2]
+    scale = min(UPLOAD_MAX_SIZE[0] / w, UPLOAD_MAX_SIZE[1] / h, 1.0)
+    if scale < 1.0:
+        frame = cv2.resize(frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+    return frame, scale
+
+
+def _encode_and_upload(frame, robot_id):
+    """Encode *frame* as JPEG, upload it and return (server result, scale).
+
+    JPEG encode cost grows with pixel count, so the frame is downscaled
+    first; *scale* maps the returned boxes back onto the full frame.
+    """
+    small, scale = _downscale(frame)
+
+    # Save captured frame to memory
+    _, img_encoded = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+
+    # Generate a unique filename using the current date and time
+    unique_filename = datetime.now().strftime("image%Y%m%d%H%M%S%f.jpg")
+    # memoryview hands the encoded buffer over without a bytes() copy
+    files = {"file": (unique_filename, memoryview(img_encoded), "image/jpeg")}
+
+    local_time_vision = datetime.now().isoformat()
+    dt_vision = datetime.fromisoformat(local_time_vision)
+    formatted_time_vision = dt_vision.strftime("%H")
+    hour = int(formatted_time_vision)  # Convert to integer
+
+    response = session.post(SERVER_URL, files=files, data={"robot_id": robot_id, "local_time_vision": hour})
+    return response.json(), scale
+
+
+def _draw_results(frame, result, scale=1.0):
+    """Draw the bounding boxes from the server's *result* onto *frame*.
+
+    Boxes are in the coordinates of the uploaded image; dividing by
+    *scale* lines them up with the full-resolution frame.
+    """
+    # print("Server Response:", json.dumps(result, indent=2))
+
+    # Draw bounding boxes from handup_result
+    handup_boxes = result.get("handup_result", {}).get("bounding_boxes", [])
+    for box in handup_boxes:
+        x1, y1, x2, y2 = (int(box[k] / scale) for k in ("x1", "y1", "x2", "y2"))
+        label = box.get("label", "")
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    logger.info(f"\n----------------\n✅ handup_boxes: {handup_boxes}\n----------------")
+
+    # Draw bounding boxes from face_recognition_result
+    face_boxes = result.get("face_recognition_result", {}).get("bounding_boxes", [])
+    for box in face_boxes:
+        x1, y1, x2, y2 = (int(box[k] / scale) for k in ("x1", "y1", "x2", "y2"))
+        label = box.get("label", "Face")
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
+        cv2.putText(frame, label, (x1, y2 + 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+    logger.info(f"\n----------------\n✅ face_boxes: {face_boxes}\n----------------")
+
+
+# Encode + upload run on a worker thread so the live feed keeps updating
+# while a request is in flight. One upload at a time: if the server is
+# slower than CAPTURE_INTERVAL the next capture simply waits for it.
+executor = ThreadPoolExecutor(max_workers=1)
+pending = None  # (captured frame, future) of the upload in flight
+
 cap = cv2.VideoCapture(0)
 last_capture_time = time.time()
 
@@ -26,46 +107,19 @@ while True:
     cv2.imshow("Live Feed", frame)
 
     current_time = time.time()
-    if current_time - last_capture_time >= CAPTURE_INTERVAL:
+    if pending is None and current_time - last_capture_time >= CAPTURE_INTERVAL:
         last_capture_time = current_time
+        captured = frame.copy()
+        pending = (captured, executor.submit(_encode_and_upload, captured, robot_id))
 
-        # Save captured frame to memory
-        _, img_encoded = cv2.imencode(".jpg", frame)
-
-        # Generate a unique filename using the current date and time
-        unique_filename = datetime.now().strftime("image%Y%m%d%H%M%S%f.jpg")
-        files = {"file": (unique_filename, img_encoded.tobytes(), "image/jpeg")}
-
+    if pending is not None and pending[1].done():
+        captured, future = pending
+        pending = None
         try:
-            local_time_vision = datetime.now().isoformat()
-            dt_vision = datetime.fromisoformat(local_time_vision)
-            formatted_time_vision = dt_vision.strftime("%H")
-            hour = int(formatted_time_vision)  # Convert to integer
-
-            response = requests.post(SERVER_URL, files=files, data={"robot_id": robot_id, "local_time_vision": hour})
-            result = response.json()
-            # print("Server Response:", json.dumps(result, indent=2))
-
-            # Draw bounding boxes from handup_result
-            handup_boxes = result.get("handup_result", {}).get("bounding_boxes", [])
-            for box in handup_boxes:
-                x1, y1, x2, y2 = box["x1"], box["y1"], box["x2"], box["y2"]
-                label = box.get("label", "")
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-            logger.info(f"\n----------------\n✅ handup_boxes: {handup_boxes}\n----------------")
-
-            # Draw bounding boxes from face_recognition_result
-            face_boxes = result.get("face_recognition_result", {}).get("bounding_boxes", [])
-            for box in face_boxes:
-                x1, y1, x2, y2 = box["x1"], box["y1"], box["x2"], box["y2"]
-                label = box.get("label", "Face")
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
-                cv2.putText(frame, label, (x1, y2 + 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-            logger.info(f"\n----------------\n✅ face_boxes: {face_boxes}\n----------------")
+            _draw_results(captured, *future.result())
 
             # Show captured frame with bounding boxes
-            cv2.imshow("Captured", frame)
+            cv2.imshow("Captured", captured)
 
         except Exception as e:
             # print("Failed to send image:", e)
@@ -75,4 +129,6 @@ while True:
         break
 
 cap.release()
+executor.shutdown(wait=True)
+session.close()
 cv2.destroyAllWindows()